@@ -26,17 +26,74 @@ functions are placeholders (marked TODO). Replace with production implementation
 (e.g., PySTAC search, Brovey pansharpen with spectral bands, CNN model inference).
 """
 from __future__ import annotations
-import argparse, pathlib, json, yaml, datetime as dt
+import argparse, contextlib, functools, pathlib, json, math, os, shelve, shutil, tempfile, threading, yaml, datetime as dt
+from typing import NamedTuple
 import numpy as np
+import pyproj
+import rasterio
 import rioxarray as rxr
 import xarray as xr
+import dask
 import dask.array as da
+from dask.delayed import Delayed
+from dask.highlevelgraph import HighLevelGraph
+from affine import Affine
 from rasterio.enums import Resampling
-from shapely.geometry import shape
-from shapely import wkt
+from rasterio.warp import reproject as rio_warp
+from rasterio.windows import Window
+from rasterio.shutil import copy as rio_copy
+from rioxarray.exceptions import NoDataInBounds
+from shapely.geometry import box, shape
+from shapely import ops, wkt
 from pystac_client import Client as StacClient
 from tqdm import tqdm
 
+try:                                    # optional: dask warps onto a GeoBox
+    from odc.geo.geobox import GeoBox
+    from odc.geo.xr import xr_reproject as odc_reproject
+except ImportError:
+    GeoBox = odc_reproject = None
+
+try:                                    # optional: multi‑process block scheduling
+    from dask.distributed import Client, as_completed
+except ImportError:
+    Client = as_completed = None
+
+try:                                    # optional: JIT pixel kernels
+    from numba import njit
+except ImportError:
+    njit = None
+
+# GDAL options for COG range‑gets over HTTP/S3. Exported process‑wide rather
+# than via rasterio.Env, which is thread‑local and would not reach the dask
+# worker threads; set before any dataset is opened (user‑exported values win)
+GDAL_COG_ENV = {
+    "GDAL_DISABLE_READDIR_ON_OPEN":       "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS":   ".tif,.TIF,.tiff",
+    "CPL_VSIL_CURL_USE_HEAD":             "NO",
+    "GDAL_CACHEMAX":                      "512",        # MB
+    "VSI_CACHE":                          "TRUE",
+    "VSI_CACHE_SIZE":                     "100000000",  # bytes per file
+    "GDAL_HTTP_MULTIPLEX":                "YES",
+    "GDAL_HTTP_VERSION":                  "2",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+}
+# AWS_* stays with the user: USGS Landsat is requester‑pays, and a global
+# AWS_NO_SIGN_REQUEST=YES would make GDAL drop their credentials
+for _k, _v in GDAL_COG_ENV.items():
+    os.environ.setdefault(_k, _v)
+
+CHUNK_MB = 128          # target dask chunk size when opening rasters
+AOI_CRS  = "EPSG:4326"  # --aoi coordinates are lon/lat
+DST_CRS  = "EPSG:32612" # output grid (UTM 12N, Utah)
+GRID_CHUNK = 512        # dask chunk edge (px) of the output grid
+WARP_MEM_MB = 512       # GDAL warper working buffer per block
+SR_TILE    = 128        # fixed SR model input edge (px); model compiled for it
+AOI_PAD_PX = 3          # source px kept around the AOI window (cubic support)
+
+# open_rasterio(chunks=True) rounds CHUNK_MB chunks to whole COG tiles
+dask.config.set({"array.chunk-size": f"{CHUNK_MB}MiB"})
+
 ###############################################################################
 # CLI PARSER
 ###############################################################################
@@ -59,6 +116,18 @@ def _parse_args() -> argparse.Namespace:
                    help="Apply 15 m Brovey pansharpen on Landsat")
     P.add_argument("--sr-model",
                    help="ID/path for super‑resolution model (used for SLSTR/MODIS)")
+    P.add_argument("--device", choices=["cpu", "cuda"], default="cpu",
+                   help="Run cubic ECOSTRESS warps (needs cupy) and the SR model "
+                        "on a CUDA GPU; other warps stay on the CPU")
+    P.add_argument("--n-workers", type=int, default=8,
+                   help="Scenes prepared / streamed concurrently")
+    P.add_argument("--distributed", action="store_true",
+                   help="Compute blocks on a local dask.distributed cluster "
+                        "(n‑workers single‑threaded processes)")
+    P.add_argument("--keep-tmp", action="store_true",
+                   help="Keep the scratch accumulator rasters")
+    P.add_argument("--cache-dir", default="~/.cache/lwst",
+                   help="On‑disk cache for STAC search results")
 
     # Cloud handling
     P.add_argument("--cloud-mask", action="store_true", default=True,
@@ -90,62 +159,503 @@ def _load_geom(aoi_spec: str):
     return wkt.loads(aoi_spec)
 
 
+def _clip_aoi(arr: xr.DataArray, aoi_geom, pad_px: int = 0) -> xr.DataArray:
+    """Lazy window of `arr` covering the AOI bbox (only intersecting tiles are read).
+
+    `pad_px` widens the window by that many source pixels (resampling support).
+    """
+    if not pad_px:
+        return arr.rio.clip_box(*aoi_geom.bounds, crs=AOI_CRS, auto_expand=True)
+    l, b, r, t = _footprint(aoi_geom.bounds, AOI_CRS, arr.rio.crs.to_string())
+    pad = pad_px * max(abs(v) for v in arr.rio.resolution())
+    return arr.rio.clip_box(l - pad, b - pad, r + pad, t + pad, auto_expand=True)
+
+
 ###############################################################################
 # SCENE WRAPPER
 ###############################################################################
 class Scene:
     """Thin wrapper for one satellite scene (LST + QA)."""
-    def __init__(self, href: str, qa_href: str | None, sensor: str, aoi_geom):
+    def __init__(self, href: str, qa_href: str | None, sensor: str, aoi_geom,
+                 proj: dict | None = None):
         self.href      = href
         self.qa_href   = qa_href
         self.sensor    = sensor
         self.aoi_geom  = aoi_geom
+        self.proj      = proj or {}    # STAC proj: fields of the LST asset
         self._lst: xr.DataArray | None = None
         self._qa : xr.DataArray | None = None
+        self.empty = False              # set when the raster misses the AOI
 
     # Lazy loaders ------------------------------------------------------------
-    def lst(self) -> xr.DataArray:
-        if self._lst is None:
-            self._lst = rxr.open_rasterio(self.href, chunks={"band": 1})
+    def lst(self) -> xr.DataArray | None:
+        if self._lst is None and not self.empty:
+            # Only COG tiles under the (padded) AOI are ever range‑read
+            # masked: LST fill values → NaN; lock=False: parallel window reads
+            arr = rxr.open_rasterio(self.href, chunks=True, masked=True, lock=False)
+            try:
+                arr = _clip_aoi(arr, self.aoi_geom, pad_px=AOI_PAD_PX)
+            except NoDataInBounds:
+                self.empty = True
+                return None
+            self._lst = arr.squeeze("band", drop=True).astype("float32")  # (y, x)
         return self._lst
 
     def qa(self) -> xr.DataArray | None:
         if self.qa_href is None:
             return None
-        if self._qa is None:
-            self._qa = rxr.open_rasterio(self.qa_href, chunks={"band": 1})
+        if self._qa is None and not self.empty:
+            # Same padded window as lst() so the two line up pixel for pixel
+            arr = rxr.open_rasterio(self.qa_href, chunks=True,
+                                    lock=False)   # raw bits, not masked
+            try:
+                arr = _clip_aoi(arr, self.aoi_geom, pad_px=AOI_PAD_PX)
+            except NoDataInBounds:
+                self.empty = True
+                return None
+            self._qa = arr.squeeze("band", drop=True)
         return self._qa
 
 
 ###############################################################################
 # DISCOVERY (PLACEHOLDERS)
 ###############################################################################
+def _search_stac(url: str, collection: str, aoi_wkt: str, start: dt.date,
+                 end: dt.date, cache_dir: pathlib.Path) -> list[dict]:
+    """
+    STAC item dicts for one collection, cached on disk per (query, AOI, dates).
+    Ranges reaching today or later are still filling in, so they bypass the cache.
+    """
+    def query() -> list[dict]:
+        search = StacClient.open(url).search(
+            collections=[collection], intersects=wkt.loads(aoi_wkt),
+            datetime=f"{start}/{end}")
+        return [item.to_dict() for item in search.items()]
+
+    if end >= dt.date.today():
+        return query()
+    key = json.dumps([url, collection, aoi_wkt, start.isoformat(), end.isoformat()])
+    with shelve.open(str(cache_dir / "stac")) as db:
+        if key not in db:
+            db[key] = query()
+        return db[key]
+
+
 def _discover_scenes(cfg: dict, geom) -> list[Scene]:
     """
     Query appropriate STAC endpoints & return Scene objects.
-    Replace this stub with production discovery using pystac_client.
+    Sources come from the YAML `stac:` list, e.g.
+      - {sensor: Landsat, url: ..., collection: ..., lst: lwir11, qa: qa_pixel}
     """
-    # TODO: Use StacClient.open() with NASA CMR, USGS landsatlook, Copernicus, LP DAAC
-    print("⚠  Discovery stub: returning empty scene list (implement me).")
-    return []
+    # TODO: Ship default sources for NASA CMR, USGS landsatlook, Copernicus, LP DAAC
+    sources = cfg.get("stac") or []
+    if not sources:
+        print("⚠  Discovery stub: no `stac:` sources configured; returning empty scene list.")
+        return []
+    cache_dir = pathlib.Path(cfg.get("cache_dir") or "~/.cache/lwst").expanduser()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    scenes = []
+    for src in sources:
+        items = _search_stac(src["url"], src["collection"], geom.wkt,
+                             cfg["start"], cfg["end"], cache_dir)
+        for item in items:
+            assets = item["assets"]
+            lst    = assets[src["lst"]]
+            scenes.append(Scene(
+                lst["href"],
+                assets[src["qa"]]["href"] if src.get("qa") else None,
+                src["sensor"], geom,
+                proj={k: v for k, v in {**item["properties"], **lst}.items()
+                      if k.startswith("proj:")}))
+    return scenes
 
 
 ###############################################################################
 # CLOUD METRICS
 ###############################################################################
-def _cloud_fraction(scene: Scene) -> float:
-    """Compute % cloud inside entire raster (AOI window optional)."""
+# Cloud bits per sensor QA band; sensors not listed treat any set bit as cloud
+LANDSAT_CLOUD_BITS = np.uint16((1 << 3) | (1 << 4))  # QA_PIXEL cloud | shadow
+MODIS_CLOUD_BITS   = np.uint16(0x3)                  # QC bits 0‑1 ≠ 00
+_CLOUD_BITS = {"Landsat": LANDSAT_CLOUD_BITS, "MODIS": MODIS_CLOUD_BITS}
+
+
+def _cloud_mask(scene: Scene, qa: xr.DataArray) -> xr.DataArray:
+    """Lazy boolean cloud mask from the bit‑packed QA (vectorised bit‑AND per chunk)."""
+    bits = _CLOUD_BITS.get(scene.sensor)
+    if bits is None:
+        return qa != 0
+    return xr.apply_ufunc(lambda a: np.bitwise_and(a, bits).astype(bool), qa,
+                          dask="parallelized", output_dtypes=[bool])
+
+
+def _mask_inplace(a: np.ndarray, clear: np.ndarray) -> np.ndarray:
+    """NaN‑out non‑clear pixels of one float32 block in a single pass."""
+    a = a.copy()
+    np.putmask(a, ~clear, np.float32("nan"))
+    return a
+
+
+# SWAR counting for small AOI windows: eight QA bytes per uint64 lane
+SWAR_MAX_BYTES = 2**20
+_SWAR_LO7  = np.uint64(0x7F7F7F7F7F7F7F7F)
+_SWAR_HI   = np.uint64(0x8080808080808080)
+_SWAR_ONES = np.uint64(0x0101010101010101)
+_SWAR_S7, _SWAR_S56 = np.uint64(7), np.uint64(56)
+
+
+def _swar_count_kernel(words, m64):
+    """Number of bytes in `words` with (byte & mask) ≠ 0, branch‑free."""
+    n = np.uint64(0)
+    for i in range(words.size):
+        x = words[i] & m64
+        t = (((x & _SWAR_LO7) + _SWAR_LO7) | x) & _SWAR_HI   # MSB per non‑zero byte
+        n += ((t >> _SWAR_S7) * _SWAR_ONES) >> _SWAR_S56      # horizontal byte sum
+    return n
+
+
+if njit is not None:
+    _swar_count_kernel = njit(cache=True)(_swar_count_kernel)
+
+
+def _swar_cloud_percent(qa: np.ndarray, bits) -> float:
+    """% of QA pixels with any of `bits` set (`bits` must fit in the low byte)."""
+    if qa.size == 0:
+        return 0.0
+    buf = np.zeros(-(-qa.size // 8) * 8, np.uint8)   # zero padding never counts
+    buf[:qa.size] = qa.ravel()                       # low byte of each pixel
+    words = buf.view(np.uint64)
+    m64   = np.uint64(int(bits) * 0x0101010101010101)
+    if njit is not None:
+        n = _swar_count_kernel(words, m64)
+    else:
+        x = words & m64
+        t = (((x & _SWAR_LO7) + _SWAR_LO7) | x) & _SWAR_HI
+        n = (((t >> _SWAR_S7) * _SWAR_ONES) >> _SWAR_S56).sum(dtype=np.uint64)
+    return int(n) / qa.size * 100.0
+
+
+def _cloud_fraction_lazy(scene: Scene) -> xr.DataArray | Delayed | float:
+    """% cloud inside the AOI window of the QA raster (lazy; batch with dask.compute)."""
     qa = scene.qa()
     if qa is None:
         return 0.0
-    cloud_mask = qa != 0  # placeholder: non‑zero = cloud
-    return float(cloud_mask.mean().compute()) * 100.0
+    try:
+        qa = _clip_aoi(qa, scene.aoi_geom)   # unpadded: statistics on the AOI only
+    except NoDataInBounds:
+        return 100.0                      # scene misses the AOI entirely
+    bits = _CLOUD_BITS.get(scene.sensor)
+    if bits is not None and bits <= 0xFF and qa.nbytes <= SWAR_MAX_BYTES:
+        return dask.delayed(_swar_cloud_percent)(qa.data, bits)
+    cloud_mask = _cloud_mask(scene, qa)
+    return cloud_mask.mean() * 100.0
+
+
+###############################################################################
+# TARGET GRID
+###############################################################################
+class Grid(NamedTuple):
+    """Shared destination grid (pixel‑corner transform, CRS, (rows, cols))."""
+    transform: Affine
+    crs: str
+    shape: tuple[int, int]
+
+    @property
+    def res(self) -> float:
+        return self.transform.a
+
+
+@functools.lru_cache(maxsize=32)
+def _xformer(src_crs: str, dst_crs: str) -> pyproj.Transformer:
+    """pyproj transformer, built once per CRS pair (thread‑safe since pyproj 3.1)."""
+    return pyproj.Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def _footprint(bounds: tuple, src_crs: str, dst_crs: str) -> tuple:
+    """`bounds` (src_crs) as a dst_crs bbox; edges densified to 17 control points."""
+    return _xformer(src_crs, dst_crs).transform_bounds(*bounds, densify_pts=17)
+
+
+def _stac_origin(scenes: list[Scene]) -> tuple[float, float]:
+    """Pixel‑lattice origin of the first Landsat scene in DST_CRS, from STAC
+    `proj:` metadata (no raster I/O); (0, 0) if none is usable."""
+    for sc in scenes:
+        p   = sc.proj
+        crs = p.get("proj:code") or (f"EPSG:{p['proj:epsg']}" if p.get("proj:epsg") else None)
+        if sc.sensor == "Landsat" and crs == DST_CRS and p.get("proj:transform"):
+            t = Affine(*p["proj:transform"][:6])
+            return t.c, t.f
+    return 0.0, 0.0
+
+
+def _target_grid(aoi_geom, res: int,
+                 origin: tuple[float, float] = (0.0, 0.0)) -> Grid:
+    """Grid in DST_CRS covering the AOI bbox, snapped outward to the `res`
+    lattice through `origin`."""
+    ox, oy = origin
+    l, b, r, t = _footprint(aoi_geom.bounds, AOI_CRS, DST_CRS)
+    l, b = ox + math.floor((l - ox) / res) * res, oy + math.floor((b - oy) / res) * res
+    r, t = ox + math.ceil((r - ox) / res) * res, oy + math.ceil((t - oy) / res) * res
+    rows, cols = max(1, round((t - b) / res)), max(1, round((r - l) / res))
+    return Grid(Affine(res, 0, l, 0, -res, t), DST_CRS, (rows, cols))
+
+
+def _grid_template(grid: Grid) -> xr.DataArray:
+    """Empty lazy float32 (y, x) array on `grid`, chunked GRID_CHUNK²."""
+    (h, w), t = grid.shape, grid.transform
+    x = t.c + t.a * (np.arange(w) + 0.5)
+    y = t.f + t.e * (np.arange(h) + 0.5)
+    data = da.empty((h, w), chunks=GRID_CHUNK, dtype="float32")
+    tmpl = xr.DataArray(data, dims=("y", "x"), coords={"y": y, "x": x})
+    return tmpl.rio.write_crs(grid.crs).rio.write_transform(t)
 
 
 ###############################################################################
 # RESAMPLING / SR / PANSHARPEN
 ###############################################################################
-def _resample_to_target(scene: Scene, cfg: dict) -> xr.DataArray:
+# Approximate cubic warp: exact pyproj transform on an APPROX_CTRL² control
+# grid only, bilinear in between (sub‑mm error at block scale), then a
+# Catmull‑Rom sampler (= GDAL's cubic kernel; serial per block) or,
+# with --device cuda, a cupyx cubic‑spline sampler.
+APPROX_CTRL = 17
+
+
+def _lerp_weights(n: int, size: int) -> np.ndarray:
+    """(size, n) matrix linearly interpolating n evenly spaced knots to `size` samples."""
+    f  = np.linspace(0, n - 1, size)
+    i0 = np.minimum(f.astype(int), n - 2)
+    w  = np.zeros((size, n))
+    w[np.arange(size), i0]     = 1 - (f - i0)
+    w[np.arange(size), i0 + 1] = f - i0
+    return w
+
+
+def _catmull_rom_kernel(src, rows, cols, out):
+    """Cubic (a = ‑0.5) sample of `src` at fractional pixel‑centre coords; NaN‑aware.
+
+    NaN wherever one of the central 2×2 taps is NaN. If only outer taps are
+    NaN or off the source, bilinear on the central four: renormalising the
+    negative‑lobe cubic weights over a partial stencil can blow up.
+    """
+    H, W = src.shape
+    h, w = out.shape
+    for i in range(h):
+        for j in range(w):
+            v, u = rows[i, j], cols[i, j]
+            if not (-0.5 <= u < W - 0.5 and -0.5 <= v < H - 0.5):
+                continue                  # outside the source: stays NaN
+            i0, j0 = int(np.floor(v)), int(np.floor(u))
+            tv, tu = v - i0, u - j0
+            y0, y1 = max(i0, 0), min(i0 + 1, H - 1)
+            x0, x1 = max(j0, 0), min(j0 + 1, W - 1)
+            p00, p01, p10, p11 = src[y0, x0], src[y0, x1], src[y1, x0], src[y1, x1]
+            if np.isnan(p00) or np.isnan(p01) or np.isnan(p10) or np.isnan(p11):
+                continue                  # hole under the pixel: stays NaN
+            full = 1 <= i0 and i0 + 2 < H and 1 <= j0 and j0 + 2 < W
+            if full:
+                wv = (((-0.5 * tv + 1.0) * tv - 0.5) * tv, (1.5 * tv - 2.5) * tv * tv + 1.0,
+                      ((-1.5 * tv + 2.0) * tv + 0.5) * tv, (0.5 * tv - 0.5) * tv * tv)
+                wu = (((-0.5 * tu + 1.0) * tu - 0.5) * tu, (1.5 * tu - 2.5) * tu * tu + 1.0,
+                      ((-1.5 * tu + 2.0) * tu + 0.5) * tu, (0.5 * tu - 0.5) * tu * tu)
+                acc = 0.0
+                for a in range(4):
+                    for b in range(4):
+                        s = src[i0 - 1 + a, j0 - 1 + b]
+                        if np.isnan(s):
+                            full = False
+                        else:
+                            acc += wv[a] * wu[b] * s
+                if full:                  # weights sum to 1: no renormalising
+                    out[i, j] = acc
+                    continue
+            out[i, j] = ((p00 * (1.0 - tu) + p01 * tu) * (1.0 - tv)
+                         + (p10 * (1.0 - tu) + p11 * tu) * tv)
+
+
+# Serial per block: dask already runs blocks in parallel (parallel=True would
+# nest thread pools; with TBB it also hangs at interpreter exit)
+if njit is not None:
+    # no fastmath: it lets LLVM assume no NaN and drops the isnan checks
+    _catmull_rom_kernel = njit(cache=True)(_catmull_rom_kernel)
+
+
+def _approx_src_pixels(src_transform: Affine, src_crs: str, shape: tuple,
+                       dst_transform: Affine) -> tuple[np.ndarray, np.ndarray]:
+    """Fractional source (row, col) pixel‑centre coords of every DST_CRS block pixel."""
+    h, w = shape
+    cy, cx = np.meshgrid(np.linspace(0, h - 1, APPROX_CTRL) + 0.5,
+                         np.linspace(0, w - 1, APPROX_CTRL) + 0.5, indexing="ij")
+    sx, sy = _xformer(DST_CRS, src_crs).transform(*(dst_transform * (cx, cy)))
+    col, row = ~src_transform * (sx, sy)
+    wy, wx = _lerp_weights(APPROX_CTRL, h), _lerp_weights(APPROX_CTRL, w)
+    return wy @ (row - 0.5) @ wx.T, wy @ (col - 0.5) @ wx.T
+
+
+def _gpu_cubic_sample(src: np.ndarray, rows: np.ndarray, cols: np.ndarray,
+                      dst: np.ndarray) -> None:
+    """Cubic‑spline sample on the GPU (cupyx map_coordinates); NaN holes kept."""
+    import cupy as cp
+    from cupyx.scipy import ndimage as cnd
+    s, coords = cp.asarray(src), cp.asarray(np.stack([rows, cols]))
+    nan = cp.isnan(s)
+    if bool(nan.all()):
+        return
+    # Spline prefilter would smear NaN over the block: fill, then re‑mask
+    s = cp.where(nan, s[~nan].mean(), s)
+    vals  = cnd.map_coordinates(s, coords, order=3, mode="nearest")
+    holes = cnd.map_coordinates(nan.astype(cp.float32), coords, order=0,
+                                mode="constant", cval=1.0) > 0
+    dst[:] = cp.asnumpy(cp.where(holes, cp.nan, vals))
+
+
+def _gpu_fits(src_shape: tuple, dst_shape: tuple) -> bool:
+    """VRAM guard: one block's source, filled copy, coords and output within
+    80 % of free device memory."""
+    import cupy as cp
+    need = 4 * (3 * src_shape[0] * src_shape[1] + 8 * dst_shape[0] * dst_shape[1])
+    return need <= cp.cuda.Device().mem_info[0] * 0.8
+
+
+def _warp_block(src: np.ndarray, src_transform: Affine, src_crs: str, src_nodata,
+                dst_shape: tuple, dst_transform: Affine, kernel: Resampling,
+                device: str = "cpu") -> np.ndarray:
+    """Warp one source window into a fresh NaN destination block."""
+    dst = np.full(dst_shape, np.nan, np.float32)
+    src = src.astype(np.float32)
+    on_gpu = (kernel == Resampling.cubic and device == "cuda"
+              and _gpu_fits(src.shape, dst_shape))
+    if on_gpu or (kernel == Resampling.cubic and njit is not None):
+        if src_nodata is not None and not np.isnan(src_nodata):
+            src[src == src_nodata] = np.nan
+        rows, cols = _approx_src_pixels(src_transform, src_crs, dst_shape, dst_transform)
+        if on_gpu:
+            _gpu_cubic_sample(src, rows, cols, dst)
+        else:
+            _catmull_rom_kernel(src, rows, cols, dst)
+        return dst
+    # Direct GDAL warp into the preallocated NaN block: no per‑call transform
+    # negotiation, fixed working‑buffer size; single‑threaded, as dask already
+    # runs one block per core
+    rio_warp(src, dst,
+             src_transform=src_transform, src_crs=src_crs, src_nodata=src_nodata,
+             dst_transform=dst_transform, dst_crs=DST_CRS, dst_nodata=np.nan,
+             resampling=kernel, num_threads=1, warp_mem_limit=WARP_MEM_MB)
+    return dst
+
+
+def _reproject(arr: xr.DataArray, grid: Grid, kernel: Resampling,
+               aoi_geom, device: str = "cpu") -> xr.DataArray:
+    """Warp onto `grid`: odc‑geo if installed, else per‑block warps.
+
+    `device="cuda"` only changes cubic warps (cupyx sampler in _warp_block);
+    average / nearest have no GPU path and stay on odc‑geo or GDAL.
+    """
+    if odc_reproject is not None and not (device == "cuda" and kernel == Resampling.cubic):
+        # Shared GeoBox: output lands exactly on `grid`, GRID_CHUNK² tiles
+        gbox = GeoBox(grid.shape, grid.transform, grid.crs)
+        return odc_reproject(arr, gbox, resampling=kernel.name, dst_nodata=np.nan,
+                             chunks=(GRID_CHUNK, GRID_CHUNK))
+    return _warp_to_grid(arr, grid, kernel, aoi_geom, device)
+
+
+def _warp_tiles(tiles: list[list[np.ndarray]], window: tuple[slice, slice],
+                **kw) -> np.ndarray:
+    """_warp_block on `window` of the source chunks under one grid block."""
+    return _warp_block(np.block(tiles)[window], **kw)
+
+
+def _warp_to_grid(arr: xr.DataArray, grid: Grid, kernel: Resampling,
+                  aoi_geom, device: str = "cpu") -> xr.DataArray:
+    """Lazy GDAL warp landing exactly on `grid`: one graph layer, one task per
+    GRID_CHUNK² block.
+
+    Each block task depends only on the source chunks under its (padded)
+    footprint, so source chunks — COG reads, QA masking — are computed once
+    and shared by every block they feed instead of being re‑read per task.
+    """
+    aoi_dst  = ops.transform(_xformer(AOI_CRS, grid.crs).transform, aoi_geom)
+    template = _grid_template(grid)
+    src, src_t = arr.data, arr.rio.transform()
+    src_crs  = arr.rio.crs.to_string()
+    pad = AOI_PAD_PX * max(abs(r) for r in arr.rio.resolution())  # cubic support
+    sy_edges, sx_edges = (np.cumsum((0,) + c) for c in src.chunks)
+    name = "warp-" + dask.base.tokenize(src.name, grid, kernel, device)
+    t, res = grid.transform, grid.res
+    y_edges, x_edges = (np.cumsum((0,) + c) for c in template.chunks)
+    dsk = {}
+    for bi, (r0, r1) in enumerate(zip(y_edges[:-1], y_edges[1:])):
+        for bj, (c0, c1) in enumerate(zip(x_edges[:-1], x_edges[1:])):
+            shape_ = (int(r1 - r0), int(c1 - c0))
+            x0, y0 = t.c + res * c0, t.f - res * r0
+            dst_box = (x0, y0 - res * shape_[0], x0 + res * shape_[1], y0)
+            dsk[(name, bi, bj)] = (functools.partial(
+                np.full, shape_, np.nan, np.float32),)
+            # Empty‑block skip: outside the AOI or outside the source footprint
+            if not aoi_dst.intersects(box(*dst_box)):
+                continue
+            fl, fb, fr, ft = _footprint(dst_box, DST_CRS, src_crs)
+            ya = max(0, math.floor((src_t.f - ft - pad) / -src_t.e))
+            yb = min(src.shape[0], math.ceil((src_t.f - fb + pad) / -src_t.e))
+            xa = max(0, math.floor((fl - pad - src_t.c) / src_t.a))
+            xb = min(src.shape[1], math.ceil((fr + pad - src_t.c) / src_t.a))
+            if ya >= yb or xa >= xb:
+                continue
+            # Source chunks overlapping rows ya:yb / cols xa:xb
+            iy = range(np.searchsorted(sy_edges, ya, "right") - 1,
+                       np.searchsorted(sy_edges, yb, "left"))
+            ix = range(np.searchsorted(sx_edges, xa, "right") - 1,
+                       np.searchsorted(sx_edges, xb, "left"))
+            window = (slice(ya - sy_edges[iy[0]], yb - sy_edges[iy[0]]),
+                      slice(xa - sx_edges[ix[0]], xb - sx_edges[ix[0]]))
+            dsk[(name, bi, bj)] = (functools.partial(
+                _warp_tiles, window=window,
+                src_transform=src_t * Affine.translation(xa, ya), src_crs=src_crs,
+                src_nodata=arr.rio.nodata, dst_shape=shape_,
+                dst_transform=Affine(res, 0, x0, 0, -res, y0), kernel=kernel,
+                device=device), [[(src.name, a, b) for b in ix] for a in iy])
+    graph = HighLevelGraph.from_collections(name, dsk, dependencies=[src])
+    out = da.Array(graph, name, template.data.chunks,
+                   meta=np.empty((0, 0), np.float32))
+    return template.copy(data=out)
+
+
+_SR_LOCK = threading.Lock()   # compiled model / CUDA graphs are not re‑entrant
+
+
+@functools.lru_cache(maxsize=None)
+def _load_sr_model(path: str, device: str = "cpu"):
+    """Load the SR CNN once, compile it for SR_TILE² inputs and warm up (None if unavailable)."""
+    try:
+        import torch
+    except ImportError:
+        print("⚠  --sr-model needs torch; using nearest‑neighbour only.")
+        return None
+    if not pathlib.Path(path).exists():
+        print(f"⚠  SR model {path!r} not found; using nearest‑neighbour only.")
+        return None
+    model = torch.load(path, map_location=device, weights_only=False).eval()
+    model = torch.compile(model, mode="reduce-overhead", dynamic=False)
+    with torch.inference_mode():
+        model(torch.zeros(1, 1, SR_TILE, SR_TILE, device=device))
+    return model
+
+
+def _sr_block(a: np.ndarray, sr_model: str, device: str) -> np.ndarray:
+    """Refine one ≤SR_TILE² block; padded to the compiled shape, NaNs restored."""
+    import torch
+    h, w  = a.shape
+    tile  = a.astype(np.float32)
+    valid = np.isfinite(tile)
+    fill  = tile[valid].mean() if valid.any() else np.float32(0)
+    x = np.full((SR_TILE, SR_TILE), fill, np.float32)
+    x[:h, :w] = np.where(valid, tile, fill)
+    with _SR_LOCK, torch.inference_mode():
+        y = _load_sr_model(sr_model, device)(
+            torch.from_numpy(x).to(device)[None, None])[0, 0, :h, :w].cpu().numpy()
+    return np.where(valid, y, np.nan).astype(np.float32)
+
+
+def _resample_to_target(scene: Scene, cfg: dict, grid: Grid) -> xr.DataArray:
     res = cfg["target_resolution"]
 
     # ECOSTRESS upscale to 30 m
@@ -153,8 +663,7 @@ def _resample_to_target(scene: Scene, cfg: dict) -> xr.DataArray:
         kernel = (Resampling.cubic
                   if cfg["ecostress_resample"] == "cubic"
                   else Resampling.average)
-        return scene.lst().rio.reproject(
-            dst_crs="EPSG:32612", resolution=res, resampling=kernel)
+        return _reproject(scene.lst(), grid, kernel, scene.aoi_geom, cfg["device"])
 
     # Landsat pansharpen stub
     if scene.sensor == "Landsat" and cfg.get("pansharpen"):
@@ -163,52 +672,257 @@ def _resample_to_target(scene: Scene, cfg: dict) -> xr.DataArray:
 
     # SLSTR / MODIS down‑scale via SR model
     if scene.sensor in {"SLSTR", "MODIS"} and res == 30 and cfg.get("sr_model"):
-        # TODO: Load CNN model & infer; fallback to nearest‑neighbour reproject
-        return scene.lst().rio.reproject(
-            dst_crs="EPSG:32612", resolution=res, resampling=Resampling.nearest)
+        # Nearest‑neighbour onto the grid, then CNN refinement per fixed tile
+        lst = _reproject(scene.lst(), grid, Resampling.nearest,
+                         scene.aoi_geom, cfg["device"])
+        if _load_sr_model(cfg["sr_model"], cfg["device"]) is None:
+            return lst
+        lst = lst.chunk({"y": SR_TILE, "x": SR_TILE})
+        return lst.copy(data=lst.data.map_blocks(
+            _sr_block, sr_model=cfg["sr_model"], device=cfg["device"],
+            dtype=np.float32))
 
     # Default: return at native grid
     return scene.lst()
 
 
+###############################################################################
+# QUANTIZATION
+###############################################################################
+# Intermediate LST is carried as int16 counts: K = counts · LST_SCALE + LST_OFFSET
+LST_OFFSET = 150.0              # K
+LST_SCALE  = 0.02               # K per count (covers 150–805 K)
+LST_NODATA = np.int16(-32768)
+
+
+def _quantize_block(a: np.ndarray) -> np.ndarray:
+    q = (a.astype(np.float32) - np.float32(LST_OFFSET)) / np.float32(LST_SCALE)
+    q = np.clip(np.rint(q), -32767, 32767)
+    return np.where(np.isfinite(q), q, LST_NODATA).astype(np.int16)
+
+
+def _quantize(arr: xr.DataArray) -> xr.DataArray:
+    """Kelvin (NaN = no data) → scaled int16 counts, lazily per chunk."""
+    return xr.apply_ufunc(_quantize_block, arr,
+                          dask="parallelized", output_dtypes=[np.int16])
+
+
 ###############################################################################
 # FUSION
 ###############################################################################
-def _fuse(arrays: list[xr.DataArray]) -> xr.DataArray:
-    """
-    Simple mean composite across time dimension.
-    Replace with STARFM/ESTARFM weight‑averaged fusion for production.
+# Simple mean composite, accumulated on disk scene by scene so memory stays at
+# one block × two accumulators regardless of the scene count.
+# Replace with STARFM/ESTARFM weight‑averaged fusion for production.
+ACC_BLOCK = 512   # tile edge (px) of the on‑disk accumulators
+
+
+def _on_grid(arr: xr.DataArray, grid: Grid) -> bool:
+    return (arr.rio.crs == grid.crs and arr.rio.transform() == grid.transform
+            and arr.shape == grid.shape)
+
+
+def _create_accumulators(grid: Grid,
+                         tmpdir: pathlib.Path) -> tuple[pathlib.Path, pathlib.Path]:
+    """Zero‑filled tiled int32 sum and uint16 count GeoTIFFs on `grid`."""
+    h, w = grid.shape
+    profile = dict(driver="GTiff", height=h, width=w, count=1, crs=grid.crs,
+                   transform=grid.transform, tiled=True,
+                   blockxsize=ACC_BLOCK, blockysize=ACC_BLOCK, BIGTIFF="IF_SAFER")
+    paths = tmpdir / "sum.tif", tmpdir / "count.tif"
+    for path, dtype in zip(paths, ("int32", "uint16")):
+        with rasterio.open(path, "w", dtype=dtype, **profile):
+            pass                          # unwritten tiles read back as 0
+    return paths
+
+
+def _accumulate_kernel(acc, cnt, block, nodata):
+    """acc += block, cnt += 1 wherever block is valid (one pass, in place)."""
+    h, w = block.shape
+    for i in range(h):
+        for j in range(w):
+            v = block[i, j]
+            if v != nodata:
+                acc[i, j] += v
+                cnt[i, j] += 1
+
+
+# Serial, like _catmull_rom_kernel: the windows are small and the loop is memory‑bound
+if njit is not None:
+    _accumulate_kernel = njit(cache=True)(_accumulate_kernel)
+
+
+class _Accumulator:
+    """`da.store` target: adds every computed block into the sum/count rasters."""
+    def __init__(self, s, n):
+        self.s, self.n = s, n
+        self.lock = threading.Lock()     # rasterio datasets are not thread‑safe
+
+    def __setitem__(self, key: tuple[slice, slice], block: np.ndarray) -> None:
+        if (block == LST_NODATA).all():
+            return
+        ys, xs = key
+        win = Window(xs.start, ys.start, xs.stop - xs.start, ys.stop - ys.start)
+        with self.lock:
+            acc, cnt = self.s.read(1, window=win), self.n.read(1, window=win)
+            if njit is not None:
+                _accumulate_kernel(acc, cnt, block, LST_NODATA)
+            else:                         # one in‑place pass, no temporaries
+                valid = block != LST_NODATA
+                np.add(acc, block, out=acc, where=valid, casting="unsafe")
+                np.add(cnt, valid, out=cnt, casting="unsafe")
+            self.s.write(acc, 1, window=win)
+            self.n.write(cnt, 1, window=win)
+
+
+def _accumulate(qs: list[xr.DataArray], sum_path: pathlib.Path,
+                cnt_path: pathlib.Path, client: Client | None = None) -> None:
+    """Add a batch of quantized scenes (on the grid) into the accumulators.
+
+    One `da.store` over the whole batch: COG reads and warps of different
+    scenes overlap, each source chunk is computed once, and finished blocks
+    are folded into the rasters as they arrive. With a distributed `client`
+    the blocks are computed on its workers and folded in here instead (the
+    rasterio handles and their lock cannot leave this process).
     """
-    if not arrays:
-        raise RuntimeError("No arrays provided for fusion.")
-    return xr.concat(arrays, dim="time").mean(dim="time")
+    with rasterio.open(sum_path, "r+") as s, rasterio.open(cnt_path, "r+") as n:
+        target = _Accumulator(s, n)
+        if client is None:
+            da.store([q.data for q in qs], [target] * len(qs), lock=False)
+            return
+        blocks, where = [], []
+        for q in qs:
+            y_edges, x_edges = (np.cumsum((0,) + c) for c in q.data.chunks)
+            for (i, j), block in np.ndenumerate(q.data.to_delayed()):
+                blocks.append(block)
+                where.append((slice(y_edges[i], y_edges[i + 1]),
+                              slice(x_edges[j], x_edges[j + 1])))
+        # One submission per batch, so shared source chunks still run once
+        futures = client.compute(blocks)
+        slot = dict(zip(futures, where))
+        del futures                       # results are released as they land
+        for fut, block in as_completed(list(slot), with_results=True):
+            target[slot.pop(fut)] = block
+
+
+def _finalize(sum_path: pathlib.Path, cnt_path: pathlib.Path,
+              out_path: pathlib.Path) -> None:
+    """Mean = sum / count, written as scaled int16 (CF scale_factor/add_offset)."""
+    chunks = {"band": 1, "y": ACC_BLOCK * 4, "x": ACC_BLOCK * 4}
+    s = rxr.open_rasterio(sum_path, chunks=chunks).squeeze("band", drop=True)
+    n = rxr.open_rasterio(cnt_path, chunks=chunks).squeeze("band", drop=True)
+    # Mean straight in quantized counts (K = counts · LST_SCALE + LST_OFFSET);
+    # float64: the int32 sums outgrow float32's 24‑bit mantissa
+    fused = xr.where(n > 0, np.rint(s / n.where(n > 0)), LST_NODATA).astype("int16")
+    fused.attrs.update(scale_factor=LST_SCALE, add_offset=LST_OFFSET, units="K")
+    fused.rio.write_nodata(LST_NODATA, inplace=True)
+    if out_path.suffix.lower() == ".nc":
+        # Same scaled int16 grid as CF NetCDF (CRS rides on spatial_ref)
+        fused.to_dataset(name="lst").to_netcdf(out_path)
+        return
+    # Stream the counts into a tiled scratch GTiff, then one COG copy pass:
+    # multi‑threaded DEFLATE + horizontal predictor, 512² blocks, overviews
+    tmp = sum_path.with_name("fused.tif")
+    fused.rio.to_raster(tmp, tiled=True, BIGTIFF="IF_SAFER", lock=threading.Lock())
+    # All cores here only: this copy is the one single‑threaded GDAL step
+    # (process‑wide, every dask thread's handle would spawn its own pool)
+    with rasterio.Env(GDAL_NUM_THREADS="ALL_CPUS"):
+        rio_copy(tmp, out_path, driver="COG", compress="DEFLATE", predictor=2,
+                 blocksize=512, num_threads="ALL_CPUS", overviews="AUTO",
+                 overview_resampling="average", BIGTIFF="IF_SAFER")
 
 
 ###############################################################################
 # MAIN PIPELINE
 ###############################################################################
+def _lazy(arr: xr.DataArray, stage: str) -> xr.DataArray:
+    """Guard against silent eager loads (e.g. xr.DataArray(DataArray) wrapping)."""
+    assert isinstance(arr.data, da.Array), f"{stage}: result is not dask‑backed"
+    return arr
+
+
+@dask.delayed
+def _process(sc: Scene, cfg: dict, grid: Grid) -> xr.DataArray:
+    """Mask → resample / SR / pansharpen → quantize one scene onto `grid` (lazy)."""
+    if cfg["cloud_mask"] and sc.qa() is not None:
+        # Apply pixel‑level mask on the same padded AOI window
+        clear  = ~_cloud_mask(sc, sc.qa())
+        lst_da = xr.apply_ufunc(
+            _mask_inplace, sc.lst(), clear,
+            dask="parallelized", output_dtypes=["float32"])
+        sc._lst = _lazy(lst_da, "cloud mask")  # override for resampling
+    da_res = _lazy(_resample_to_target(sc, cfg, grid), "resample")
+    if not _on_grid(da_res, grid):   # native‑grid output
+        da_res = _lazy(_warp_to_grid(da_res, grid, Resampling.nearest,
+                                     sc.aoi_geom), "warp")
+    # Uniform GRID_CHUNK² tiles (SR outputs come back finer)
+    da_res = da_res.chunk({"y": GRID_CHUNK, "x": GRID_CHUNK})
+    return _lazy(_quantize(da_res), "quantize")
+
+
 def run_pipeline(cfg: dict):
     aoi_geom = _load_geom(cfg["aoi"])
     scenes   = _discover_scenes(cfg, aoi_geom)
-
-    valid_arrays: list[xr.DataArray] = []
-    for sc in tqdm(scenes, desc="Scenes"):
-        # Cloud filtering -----------------------------------------------------
-        if cfg["cloud_mask"] and sc.qa() is not None:
-            cf = _cloud_fraction(sc)
-            if cf > cfg["max_cloud"]:
-                continue
-            # Apply pixel‑level mask (placeholder: QA==0 clear)
-            lst_da = xr.where(sc.qa() == 0, sc.lst(), np.nan)
-            sc._lst = lst_da  # override for resampling
-        # Resample / SR / pansharp -------------------------------------------
-        da_res = _resample_to_target(sc, cfg)
-        valid_arrays.append(da_res)
-
-    fused = _fuse(valid_arrays)
-    out_path = pathlib.Path(cfg["out"]).expanduser().resolve()
-    fused.rio.to_raster(out_path)
-    print("✓ Fusion complete →", out_path)
+    # Snap to the Landsat pixel lattice so its 30 m LST needs no resampling
+    grid     = _target_grid(aoi_geom, cfg["target_resolution"], _stac_origin(scenes))
+    n_workers = cfg.get("n_workers") or 8
+
+    if cfg["device"] == "cuda":
+        try:
+            import cupy
+        except ImportError:
+            cupy = None
+        if cupy is None:
+            print("⚠  --device cuda needs cupy; reprojecting on CPU.")
+            cfg["device"] = "cpu"
+
+    # Open every LST / QA handle in one concurrent wave (each open is a
+    # synchronous remote metadata read; the handles cache on the Scene)
+    dask.compute(*[dask.delayed(f)() for sc in scenes for f in (sc.lst, sc.qa)],
+                 scheduler="threads", num_workers=n_workers)
+    scenes = [sc for sc in scenes if not sc.empty]   # footprint misses the AOI
+
+    if cfg.get("sr_model"):                # compile + warm up before the scene loop
+        _load_sr_model(cfg["sr_model"], cfg["device"])
+
+    # Cloud filtering: one dask.compute for every scene's cloud fraction ----
+    if cfg["cloud_mask"]:
+        fracs  = dask.compute(*[_cloud_fraction_lazy(sc) for sc in scenes])
+        scenes = [sc for sc, cf in zip(scenes, fracs)
+                  if float(cf) <= cfg["max_cloud"]]
+
+    if not scenes:
+        raise RuntimeError("No scenes left to fuse.")
+    tmpdir = pathlib.Path(tempfile.mkdtemp(prefix="lwst_"))
+    try:
+        sum_path, cnt_path = _create_accumulators(grid, tmpdir)
+
+        # Build every scene's lazy graph concurrently (header / window I/O), then
+        # stream them into the accumulators n_workers scenes at a time.
+        qs = dask.compute(*[_process(sc, cfg, grid) for sc in scenes],
+                          scheduler="threads", num_workers=n_workers)
+        # GDAL warps scale better across processes than across threads
+        cluster = contextlib.nullcontext()
+        if cfg.get("distributed"):
+            if Client is None:
+                print("⚠  --distributed needs dask.distributed; using threads.")
+            else:
+                cluster = Client(processes=True, n_workers=n_workers,
+                                 threads_per_worker=1, memory_limit="2GB")
+        with cluster as client, tqdm(total=len(qs), desc="Scenes") as bar:
+            for i in range(0, len(qs), n_workers):
+                batch = qs[i:i + n_workers]
+                _accumulate(batch, sum_path, cnt_path, client)
+                bar.update(len(batch))
+
+        out_path = pathlib.Path(cfg["out"]).expanduser().resolve()
+        _finalize(sum_path, cnt_path, out_path)
+        print("✓ Fusion complete →", out_path)
+    finally:
+        if cfg.get("keep_tmp"):
+            print("   scratch rasters kept in", tmpdir)
+        else:                              # non‑daemon: finishes before exit
+            threading.Thread(target=shutil.rmtree, args=(tmpdir,),
+                             kwargs={"ignore_errors": True}).start()
 
 
 ###############################################################################
@@ -221,6 +935,9 @@ def _merge_cli_yaml(args: argparse.Namespace) -> dict:
             cfg.update(yaml.safe_load(f) or {})
     cfg["target_resolution"] = int(cfg["target_resolution"])
     cfg["max_cloud"]         = float(cfg["max_cloud"])
+    # Parse dates once (YAML may already hand back datetime.date objects)
+    cfg["start"] = dt.date.fromisoformat(str(cfg["start"]))
+    cfg["end"]   = dt.date.fromisoformat(str(cfg["end"]))
     return cfg
 
 